@@ -1,6 +1,6 @@
 """LLM-based extraction and deduplication for auto-storing memos from conversation exchanges."""
 
-import json
+import orjson
 
 from openai import AsyncOpenAI
 
@@ -71,7 +71,7 @@ async def analyze_for_store(content: str) -> dict:
             temperature=0,
             max_tokens=1200,
         )
-        return json.loads(resp.choices[0].message.content)
+        return orjson.loads(resp.choices[0].message.content)
     except Exception as e:
         return {"should_store": False, "reason": f"analysis error: {e}"}
 
@@ -93,6 +93,6 @@ async def analyze_for_merge(existing_content: str, new_content: str) -> dict:
             temperature=0,
             max_tokens=2000,
         )
-        return json.loads(resp.choices[0].message.content)
+        return orjson.loads(resp.choices[0].message.content)
     except Exception as e:
         return {"action": "create", "reason": f"merge analysis error: {e}"}
@@ -6,10 +6,19 @@ class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
 
     port: int = 8000
+    workers: int = 1
     openrouter_api_key: str
     embedding_model: str = "openai/text-embedding-3-small"
     embedding_dimensions: int = 1536
+    embedding_cache_size: int = 4096
+    embedding_cache_file: str = ""
+    embedding_batch_window_ms: float = 10.0
+    embedding_max_batch: int = 128
     default_db_path: str = "~/.memo/memo.db"
+    db_max_readers: int = 4
+    db_max_pools: int = 32
+    store_batch_window_ms: float = 10.0
+    store_batch_max: int = 32
 
     # Hook settings (written to ~/.memo/hooks.env during memo-hooks install)
     memo_auto_recall: bool = True
@@ -26,5 +35,12 @@ class Settings(BaseSettings):
     def resolved_default_db_path(self) -> str:
         return str(Path(self.default_db_path).expanduser())
 
+    @property
+    def resolved_embedding_cache_file(self) -> str:
+        # Defaults to a file beside the default DB so it lands on the same (mounted) volume
+        if self.embedding_cache_file:
+            return str(Path(self.embedding_cache_file).expanduser())
+        return str(Path(self.resolved_default_db_path).with_name("embedding-cache.npz"))
+
 
 settings = Settings()
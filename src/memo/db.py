@@ -1,20 +1,50 @@
 import asyncio
+import functools
+import heapq
 import json
+import os
+import re
 import sqlite3
 import struct
+import threading
 import uuid
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, suppress
 from pathlib import Path
-from time import time
+from time import time, time_ns
 
+import numpy as np
+import orjson
 import sqlite_vec
 import tiktoken
 
 from memo.config import settings
 
-_connections: dict[str, sqlite3.Connection] = {}
 _tokenizer = tiktoken.get_encoding("cl100k_base")
+# Bound once; encode_ordinary also skips the special-token scan (we only need a count)
+_encode = _tokenizer.encode_ordinary
 
+# The INT8 first pass fetches this many candidates per requested result for the FP32 rerank
+_RERANK_OVERSAMPLE = 4
+# Upper bound vec0 accepts for k in a KNN query
+_VEC0_MAX_K = 4096
+# Dead slots tolerated in the FP32 sidecar beyond one per live vector before compacting
+_VECTOR_FILE_SLACK = 1024
+# How long a starting process waits for another one to finish migrating the schema
+_MIGRATION_BUSY_TIMEOUT_MS = 600_000
 
+# Embeddings arrive as float32 ndarrays from memo.embeddings; plain lists are also accepted
+_Vector = np.ndarray | list[float]
+
+
+# Settings are fixed for the life of the process
+_DEFAULT_DB_PATH = settings.resolved_default_db_path
+_DATA_DIR = Path(_DEFAULT_DB_PATH).parent
+
+
+@functools.lru_cache(maxsize=1024)
 def _resolve_path(db_path: str | None) -> str:
     if db_path:
         p = Path(db_path)
@@ -24,218 +54,835 @@ def _resolve_path(db_path: str | None) -> str:
         # Directory path — encode as a safe filename within the data volume
         # e.g. /mnt/nas/data/files → <data_dir>/mnt_nas_data_files.memo.db
         safe_name = str(p).strip("/").replace("/", "_")
-        data_dir = Path(settings.resolved_default_db_path).parent
-        return str(data_dir / f"{safe_name}.memo.db")
-    return settings.resolved_default_db_path
+        return str(_DATA_DIR / f"{safe_name}.memo.db")
+    return _DEFAULT_DB_PATH
 
 
 def global_path() -> str:
-    return settings.resolved_default_db_path
+    return _DEFAULT_DB_PATH
+
+
+def _uuid7() -> str:
+    """Time-ordered UUIDv7 (RFC 9562): 48-bit ms timestamp followed by random bits.
+
+    New ids sort after existing ones, so inserts append to the end of the primary-key
+    B-tree instead of landing on random pages.
+    """
+    value = (time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), "big")
+    value = (value & ~(0xF << 76)) | (0x7 << 76)  # version 7
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)  # RFC 4122 variant
+    return str(uuid.UUID(int=value))
 
 
 def _count_tokens(text: str) -> int:
-    return len(_tokenizer.encode(text))
+    if not text:
+        return 0
+    return len(_encode(text))
+
 
+async def _count_tokens_async(text: str) -> int:
+    # Counted before the write is queued, so BPE on large content never holds up the single
+    # writer thread (tiktoken releases the GIL while encoding). Short texts are cheaper to
+    # count inline than to hand to a thread.
+    if len(text) < 1024:
+        return _count_tokens(text)
+    return await asyncio.to_thread(_count_tokens, text)
 
-def _get_or_create_conn(db_path: str) -> sqlite3.Connection:
-    if db_path in _connections:
-        return _connections[db_path]
 
-    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(db_path, check_same_thread=False)
+def _count_tokens_batch(texts: list[str]) -> list[int]:
+    """Count tokens for many texts at once; tiktoken tokenizes the batch in parallel."""
+    encoded = _tokenizer.encode_ordinary_batch(texts, num_threads=os.cpu_count() or 1)
+    return [len(tokens) for tokens in encoded]
+
+
+# --- Connection pool ---
+
+def _open_conn(db_path: str, readonly: bool = False) -> sqlite3.Connection:
+    if readonly:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+    else:
+        conn = sqlite3.connect(db_path, check_same_thread=False)
     conn.row_factory = sqlite3.Row
 
     conn.enable_load_extension(True)
     sqlite_vec.load(conn)
     conn.enable_load_extension(False)
 
-    conn.execute("PRAGMA journal_mode=WAL")
+    if not readonly:
+        conn.execute("PRAGMA journal_mode=WAL")
     conn.execute("PRAGMA busy_timeout=5000")
-
-    _init_schema(conn)
-    _connections[db_path] = conn
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA cache_size=-64000")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA mmap_size=268435456")
     return conn
 
 
-def _init_schema(conn: sqlite3.Connection) -> None:
-    conn.executescript(f"""
+class VectorFile:
+    """Append-only FP32 copy of a DB's embeddings (``<db>-vectors.f32``), read via memmap.
+
+    ``vector_offsets`` maps doc_id → slot (row index in the file) and is written in the
+    same transaction as the vec0 rows, after the vector has been appended, so a committed
+    slot always points at written data. Replaced and deleted vectors leave dead slots; the
+    writer compacts the file once they outnumber live ones (see _compact_if_sparse), and
+    startup does the same. Compaction writes a new generation file (``vector_meta`` records
+    the current one) instead of rewriting the old file, so readers still mapping it never
+    see it shrink. Slots past the end of the file (sidecar missing or truncated) fall back
+    to reading ``document_embeddings``.
+    """
+
+    def __init__(self, db_path: str, dims: int) -> None:
+        self.db_path = db_path
+        self.dims = dims
+        self.stride = dims * 4
+        self._map: np.ndarray | None = None
+        self._map_generation = -1
+        self._lock = threading.Lock()
+        # Writer only: file size (rows) at which live slots are next counted, and the
+        # previous generation's file once a compaction has run in the open transaction
+        self.check_at = 0
+        self.superseded: str | None = None
+
+    def path(self, generation: int) -> str:
+        if generation == 0:
+            return f"{self.db_path}-vectors.f32"
+        return f"{self.db_path}-vectors.{generation}.f32"
+
+    def rows(self, generation: int) -> int:
+        try:
+            return os.path.getsize(self.path(generation)) // self.stride
+        except FileNotFoundError:
+            return 0
+
+    def append(self, generation: int, vectors: list[bytes]) -> int:
+        """Append FP32 vectors and return the slot of the first. Writer only, inside the
+        write transaction."""
+        with open(self.path(generation), "ab") as f:
+            end = f.seek(0, os.SEEK_END)
+            slot = -(-end // self.stride)  # pad past a torn tail write
+            f.write(b"\0" * (slot * self.stride - end) + b"".join(vectors))
+        return slot
+
+    def view(self, generation: int, rows: int) -> np.ndarray | None:
+        """(n, dims) read-only map of a generation's file, remapped if it is a different
+        generation, covers fewer than `rows` rows, or is longer than the file now is (reading
+        a mapped page past a truncated end would fault)."""
+        n = self.rows(generation)
+        with self._lock:
+            if (self._map_generation != generation or self._map is None
+                    or len(self._map) < min(rows, n) or len(self._map) > n):
+                try:
+                    self._map = (
+                        np.memmap(self.path(generation), dtype=np.float32, mode="r",
+                                  shape=(n, self.dims))
+                        if n else None
+                    )
+                except FileNotFoundError:  # superseded by a compaction since `rows`
+                    self._map = None
+                self._map_generation = generation
+            return self._map
+
+    def drop_superseded(self) -> None:
+        """Remove the file replaced by a committed compaction. Readers that already mapped
+        it keep their mapping; new ones use the new generation."""
+        path, self.superseded = self.superseded, None
+        if path is not None:
+            with suppress(FileNotFoundError):
+                os.remove(path)
+
+
+class Pool:
+    """Per-DB connections and the threads that use them.
+
+    Reads run on ``read_executor`` (``max_readers`` threads), each thread holding its own
+    read-only connection, so searches/lists get their own statement and page caches and
+    run in parallel (WAL lets them proceed during a write). Writes run on a single-thread
+    ``write_executor`` against the one read-write connection, and each ``writer()`` block
+    is one transaction (committed on exit, rolled back on error).
+
+    Connections are opened lazily on the worker threads, so creating a Pool from the event
+    loop does no I/O; the writer opens first and brings the schema up to date. At most
+    ``db_max_pools`` pools stay open; the least recently used is closed to make room.
+    """
+
+    def __init__(self, db_path: str, max_readers: int) -> None:
+        self.db_path = db_path
+        self.read_executor = ThreadPoolExecutor(max_workers=max_readers, thread_name_prefix="memo-read")
+        self.write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memo-write")
+        self._writer: sqlite3.Connection | None = None
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        self._readers: list[sqlite3.Connection] = []
+        self.vectors = VectorFile(db_path, settings.embedding_dimensions)
+
+    def _writer_conn(self) -> sqlite3.Connection:
+        # Caller holds _write_lock
+        if self._writer is None:
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            conn = _open_conn(self.db_path)
+            _init_schema(conn, self.vectors)
+            self._writer = conn
+        return self._writer
+
+    @contextmanager
+    def reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self._writer is None:
+                # A read-only open needs the file and schema to exist already
+                with self._write_lock:
+                    self._writer_conn()
+            conn = self._local.conn = _open_conn(self.db_path, readonly=True)
+            self._readers.append(conn)
+        yield conn
+
+    @contextmanager
+    def writer(self):
+        # The lock only matters for sync callers off the write executor (e.g. _sync_move
+        # deleting from the source DB while running on the destination's writer thread)
+        with self._write_lock:
+            conn = self._writer_conn()
+            try:
+                with conn:
+                    yield conn
+            except BaseException:
+                self.vectors.superseded = None  # compaction rolled back; old file stays current
+                raise
+            self.vectors.drop_superseded()
+
+    def close(self) -> None:
+        """Let queued work finish, then stop the threads and close every connection."""
+        self.read_executor.shutdown(wait=True)
+        self.write_executor.shutdown(wait=True)
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        for conn in self._readers:
+            conn.close()
+        self._readers.clear()
+
+
+# db_path comes from clients, so pools are kept in LRU order (least recent first) and
+# capped at db_max_pools rather than accumulating threads and connections per path
+_pools: OrderedDict[str, Pool] = OrderedDict()
+_pools_lock = threading.Lock()
+
+
+def _get_pool(db_path: str) -> Pool:
+    with _pools_lock:
+        pool = _pools.get(db_path)
+        if pool is not None:
+            _pools.move_to_end(db_path)
+            return pool
+        pool = _pools[db_path] = Pool(db_path, settings.db_max_readers)
+        while len(_pools) > settings.db_max_pools:
+            _, evicted = _pools.popitem(last=False)
+            # Closed on its own thread: close() waits for the evicted pool's workers, and
+            # the caller may be one of them
+            threading.Thread(target=evicted.close, name="memo-pool-close", daemon=True).start()
+    return pool
+
+
+def _run_read(db_path: str, fn, *args):
+    """Run a sync read op on db_path's reader threads."""
+    loop = asyncio.get_running_loop()
+    try:
+        return loop.run_in_executor(_get_pool(db_path).read_executor, fn, *args)
+    except RuntimeError:  # pool evicted between lookup and submit; use its replacement
+        return loop.run_in_executor(_get_pool(db_path).read_executor, fn, *args)
+
+
+def _run_write(db_path: str, fn, *args):
+    """Run a sync write op on db_path's single writer thread."""
+    loop = asyncio.get_running_loop()
+    try:
+        return loop.run_in_executor(_get_pool(db_path).write_executor, fn, *args)
+    except RuntimeError:  # pool evicted between lookup and submit; use its replacement
+        return loop.run_in_executor(_get_pool(db_path).write_executor, fn, *args)
+
+
+def _table_sql(conn: sqlite3.Connection, name: str) -> str:
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else ""
+
+
+def _init_schema(conn: sqlite3.Connection, vectors: VectorFile) -> None:
+    # Every step runs in one write transaction and re-checks its condition inside it, so
+    # several server processes starting on the same DB apply each migration exactly once;
+    # the others wait on the lock (for as long as a large backfill takes) and then see the
+    # migrated schema. Statements go through execute() because executescript() would
+    # commit the transaction.
+    conn.execute(f"PRAGMA busy_timeout={_MIGRATION_BUSY_TIMEOUT_MS}")
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        _migrate(conn, vectors)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        vectors.superseded = None
+        raise
+    finally:
+        conn.execute("PRAGMA busy_timeout=5000")
+    vectors.drop_superseded()
+
+
+def _migrate(conn: sqlite3.Connection, vectors: VectorFile) -> None:
+    """Create or upgrade the schema inside the caller's write transaction. A rebuilt FP32
+    sidecar leaves the file it replaced in ``vectors.superseded``, to remove after commit."""
+    conn.execute("""
         CREATE TABLE IF NOT EXISTS documents (
             id TEXT PRIMARY KEY,
             content TEXT NOT NULL,
             title TEXT,
             tags TEXT DEFAULT '[]',
-            metadata TEXT DEFAULT '{{}}',
+            metadata TEXT DEFAULT '{}',
             token_count INTEGER NOT NULL DEFAULT 0,
             created_at REAL NOT NULL,
             updated_at REAL NOT NULL
-        );
-
+        )
+    """)
+    conn.execute(f"""
         CREATE VIRTUAL TABLE IF NOT EXISTS document_embeddings USING vec0(
-            doc_id TEXT,
+            doc_id TEXT PRIMARY KEY,
             embedding FLOAT[{settings.embedding_dimensions}] distance_metric=cosine
-        );
+        )
     """)
     # Migration: add token_count to existing DBs that predate this column
     cols = {row[1] for row in conn.execute("PRAGMA table_info(documents)")}
     if "token_count" not in cols:
         conn.execute("ALTER TABLE documents ADD COLUMN token_count INTEGER NOT NULL DEFAULT 0")
-    conn.commit()
+    conn.execute("CREATE INDEX IF NOT EXISTS documents_created_at ON documents(created_at DESC)")
+    conn.execute("CREATE INDEX IF NOT EXISTS documents_token_count ON documents(token_count)")
+
+    # One row per (tag, document) so tag filters are index lookups instead of a JSON scan
+    # of every document's tags. Backfilled from documents.tags when first created.
+    if not _table_sql(conn, "doc_tags"):
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS doc_tags (
+                tag TEXT NOT NULL,
+                doc_id TEXT NOT NULL,
+                PRIMARY KEY (tag, doc_id)
+            ) WITHOUT ROWID
+        """)
+        conn.execute(
+            "INSERT OR IGNORE INTO doc_tags (tag, doc_id) "
+            "SELECT t.value, d.id FROM documents d, json_each(d.tags) t"
+        )
+    conn.execute("CREATE INDEX IF NOT EXISTS doc_tags_doc_id ON doc_tags(doc_id)")
+
+    # Migration: older DBs key document_embeddings by a plain doc_id column, so every
+    # per-document lookup is a full scan. Rebuild it with doc_id as the primary key.
+    if "PRIMARY KEY" not in _table_sql(conn, "document_embeddings"):
+        conn.execute(
+            "CREATE TEMP TABLE _embeddings_backup AS "
+            "SELECT doc_id, embedding FROM document_embeddings"
+        )
+        conn.execute("DROP TABLE document_embeddings")
+        conn.execute(f"""
+            CREATE VIRTUAL TABLE document_embeddings USING vec0(
+                doc_id TEXT PRIMARY KEY,
+                embedding FLOAT[{settings.embedding_dimensions}] distance_metric=cosine
+            )
+        """)
+        conn.execute(
+            "INSERT INTO document_embeddings (doc_id, embedding) "
+            "SELECT doc_id, embedding FROM _embeddings_backup GROUP BY doc_id"
+        )
+        conn.execute("DROP TABLE _embeddings_backup")
+
+    # INT8 copy of every embedding used for the first-pass ANN search (FP32 is kept for rerank).
+    # created_at/token_count are mirrored as vec0 metadata columns so date and token filters
+    # are applied inside the KNN scan. Rebuilt from the FP32 table when missing or outdated.
+    if "created_at" not in _table_sql(conn, "document_embeddings_i8"):
+        _build_quantized_index(conn)
+
+    # FP32 sidecar used by the rerank. Rebuilt when new, when the file no longer covers
+    # every recorded slot (deleted/truncated) — appending to a short file would otherwise
+    # hand out slots that stale vector_offsets rows still point at — and compacted once
+    # dead slots from re-embeds and deletes outnumber live ones.
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS vector_offsets (doc_id TEXT PRIMARY KEY, slot INTEGER NOT NULL)"
+    )
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS vector_meta (
+            id INTEGER PRIMARY KEY CHECK (id = 0),
+            generation INTEGER NOT NULL
+        )
+    """)
+    conn.execute("INSERT OR IGNORE INTO vector_meta (id, generation) VALUES (0, 0)")
+    max_slot, count = conn.execute("SELECT MAX(slot), COUNT(*) FROM vector_offsets").fetchone()
+    rows = vectors.rows(_vector_generation(conn))
+    if (
+        (max_slot is not None and max_slot >= rows)
+        or (count == 0 and conn.execute("SELECT 1 FROM documents LIMIT 1").fetchone())
+        or rows > 2 * count + _VECTOR_FILE_SLACK
+    ):
+        vectors.superseded = _build_vector_file(conn, vectors)
+    vectors.check_at = 2 * count + _VECTOR_FILE_SLACK + 1
+
+
+def _build_quantized_index(conn: sqlite3.Connection) -> None:
+    conn.execute("DROP TABLE IF EXISTS document_embeddings_i8")
+    conn.execute(f"""
+        CREATE VIRTUAL TABLE document_embeddings_i8 USING vec0(
+            doc_id TEXT PRIMARY KEY,
+            embedding INT8[{settings.embedding_dimensions}] distance_metric=cosine,
+            created_at FLOAT,
+            token_count INTEGER
+        )
+    """)
+    rows = conn.execute(
+        "SELECT de.doc_id, de.embedding, CAST(d.created_at AS REAL), d.token_count "
+        "FROM document_embeddings de JOIN documents d ON d.id = de.doc_id"
+    )
+    conn.executemany(
+        "INSERT INTO document_embeddings_i8 (doc_id, embedding, created_at, token_count) "
+        "VALUES (?, vec_int8(?), ?, ?)",
+        ((doc_id, _quantize_vector(emb), created_at, token_count)
+         for doc_id, emb, created_at, token_count in rows),
+    )
+
+
+def _vector_generation(conn: sqlite3.Connection) -> int:
+    return conn.execute("SELECT generation FROM vector_meta").fetchone()[0]
+
+
+def _build_vector_file(conn: sqlite3.Connection, vectors: VectorFile) -> str:
+    """Write every embedding into a fresh generation file and repoint vector_offsets at it.
+    Returns the previous generation's path, to be removed once this transaction commits."""
+    old = _vector_generation(conn)
+    new = old + 1
+    open(vectors.path(new), "wb").close()
+    conn.execute("DELETE FROM vector_offsets")
+    rows = conn.execute("SELECT doc_id, embedding FROM document_embeddings")
+    while batch := rows.fetchmany(1024):
+        slot = vectors.append(new, [emb for _, emb in batch])
+        conn.executemany(
+            "INSERT INTO vector_offsets (doc_id, slot) VALUES (?, ?)",
+            [(doc_id, slot + i) for i, (doc_id, _) in enumerate(batch)],
+        )
+    conn.execute("UPDATE vector_meta SET generation = ?", (new,))
+    return vectors.path(old)
+
+
+@functools.lru_cache(maxsize=8)
+def _vector_struct(dims: int) -> struct.Struct:
+    return struct.Struct(f"{dims}f")
+
+
+def _serialize_vector(v: _Vector | bytes | memoryview) -> bytes:
+    # Pre-serialized float32 buffers (e.g. raw embedding bytes) pass straight through
+    if isinstance(v, (bytes, memoryview)):
+        return bytes(v)
+    # ndarrays (what memo.embeddings returns) copy their buffer directly; for plain lists a
+    # precompiled Struct is ~3x faster than numpy's per-element list conversion
+    if isinstance(v, np.ndarray):
+        return v.astype(np.float32, copy=False).tobytes()
+    return _vector_struct(len(v)).pack(*v)
+
+
+def _quantize_vector(v: _Vector | bytes | memoryview) -> bytes:
+    """Symmetric per-vector INT8 quantization.
+
+    Cosine distance ignores vector magnitude, so the per-vector scale does not need to be
+    stored for the ANN pass — exact scores come from the FP32 rerank.
+    """
+    if isinstance(v, np.ndarray):
+        a = v.astype(np.float32, copy=False)
+    else:
+        a = np.frombuffer(_serialize_vector(v), dtype=np.float32)
+    peak = float(np.abs(a).max()) if a.size else 0.0
+    if peak == 0.0:
+        return np.zeros(a.shape, dtype=np.int8).tobytes()
+    return np.rint(a * (127.0 / peak)).astype(np.int8).tobytes()
+
+
+def _insert_embeddings(conn: sqlite3.Connection, vectors: VectorFile,
+                       rows: list[tuple[str, bytes, float, int]]) -> None:
+    """Insert (doc_id, fp32 embedding bytes, created_at, token_count) rows into both vector
+    tables and the FP32 sidecar."""
+    slot = vectors.append(_vector_generation(conn), [embedding for _, embedding, _, _ in rows])
+    conn.executemany(
+        "INSERT INTO vector_offsets (doc_id, slot) VALUES (?, ?)",
+        [(row[0], slot + i) for i, row in enumerate(rows)],
+    )
+    conn.executemany(
+        "INSERT INTO document_embeddings (doc_id, embedding) VALUES (?, ?)",
+        [(doc_id, embedding) for doc_id, embedding, _, _ in rows],
+    )
+    conn.executemany(
+        "INSERT INTO document_embeddings_i8 (doc_id, embedding, created_at, token_count) "
+        "VALUES (?, vec_int8(?), ?, ?)",
+        [(doc_id, _quantize_vector(embedding), float(created_at), token_count)
+         for doc_id, embedding, created_at, token_count in rows],
+    )
+    _compact_if_sparse(conn, vectors)
+
+
+def _replace_embedding(conn: sqlite3.Connection, vectors: VectorFile, doc_id: str,
+                       embedding: bytes, created_at: float, token_count: int) -> None:
+    """Swap a document's vectors. The FP32 row is updated in place; vec0 loses the int8
+    subtype on UPDATE, so the INT8 row still has to be deleted and re-inserted."""
+    conn.execute(
+        "INSERT INTO vector_offsets (doc_id, slot) VALUES (?, ?) "
+        "ON CONFLICT(doc_id) DO UPDATE SET slot = excluded.slot",
+        (doc_id, vectors.append(_vector_generation(conn), [embedding])),
+    )
+    cur = conn.execute(
+        "UPDATE document_embeddings SET embedding = ? WHERE doc_id = ?", (embedding, doc_id)
+    )
+    if cur.rowcount == 0:
+        conn.execute(
+            "INSERT INTO document_embeddings (doc_id, embedding) VALUES (?, ?)",
+            (doc_id, embedding),
+        )
+    conn.execute("DELETE FROM document_embeddings_i8 WHERE doc_id = ?", (doc_id,))
+    conn.execute(
+        "INSERT INTO document_embeddings_i8 (doc_id, embedding, created_at, token_count) "
+        "VALUES (?, vec_int8(?), ?, ?)",
+        (doc_id, _quantize_vector(embedding), float(created_at), token_count),
+    )
+    _compact_if_sparse(conn, vectors)
+
+
+def _delete_embedding(conn: sqlite3.Connection, vectors: VectorFile, doc_id: str) -> None:
+    conn.execute("DELETE FROM document_embeddings WHERE doc_id = ?", (doc_id,))
+    conn.execute("DELETE FROM document_embeddings_i8 WHERE doc_id = ?", (doc_id,))
+    cur = conn.execute("DELETE FROM vector_offsets WHERE doc_id = ?", (doc_id,))
+    # One live slot fewer lowers the compaction threshold by two
+    vectors.check_at -= 2 * cur.rowcount
+    _compact_if_sparse(conn, vectors)
+
+
+def _compact_if_sparse(conn: sqlite3.Connection, vectors: VectorFile) -> None:
+    """Compact the sidecar inside the open write transaction once dead slots outnumber
+    live ones (plus slack), so a long-running server doesn't grow it until restart.
+    Counting live slots scans vector_offsets, so it only happens once the file reaches the
+    threshold computed at the previous count."""
+    rows = vectors.rows(_vector_generation(conn))
+    if rows < vectors.check_at:
+        return
+    count = conn.execute("SELECT COUNT(*) FROM vector_offsets").fetchone()[0]
+    if rows > 2 * count + _VECTOR_FILE_SLACK:
+        vectors.superseded = _build_vector_file(conn, vectors)
+    vectors.check_at = 2 * count + _VECTOR_FILE_SLACK + 1
+
+
+def _rerank(conn: sqlite3.Connection, vectors: VectorFile, doc_ids: list[str],
+            embedding: _Vector, top: int,
+            min_score: float | None = None) -> list[tuple[str, float]]:
+    """Score INT8 ANN candidates by exact FP32 cosine similarity; the best `top` scoring at
+    least `min_score`, best first.
+
+    Vectors are gathered from the memory-mapped sidecar; only candidates without a usable
+    slot are read back from document_embeddings.
+    """
+    # The generation is read in the same statement so the slots and the file they index
+    # come from one snapshot, even if a compaction commits in between
+    found = conn.execute(
+        "SELECT doc_id, slot, (SELECT generation FROM vector_meta) FROM vector_offsets "
+        "WHERE doc_id IN (SELECT value FROM json_each(?))",
+        (_dumps(doc_ids),),
+    ).fetchall()
+    slots = {doc_id: slot for doc_id, slot, _ in found}
+    mapped = vectors.view(found[0][2], max(slots.values()) + 1) if found else None
+    n = 0 if mapped is None else len(mapped)
+
+    ids, rows, missing = [], [], []
+    for doc_id in doc_ids:
+        slot = slots.get(doc_id)
+        if slot is not None and slot < n:
+            ids.append(doc_id)
+            rows.append(slot)
+        else:
+            missing.append(doc_id)
+    matrix = mapped[rows] if rows else np.empty((0, vectors.dims), dtype=np.float32)
+
+    blobs = []
+    for doc_id in missing:
+        row = conn.execute(
+            "SELECT embedding FROM document_embeddings WHERE doc_id = ?", (doc_id,)
+        ).fetchone()
+        if row is not None:
+            ids.append(doc_id)
+            blobs.append(row[0])
+    if blobs:
+        fallback = np.frombuffer(b"".join(blobs), dtype=np.float32).reshape(len(blobs), -1)
+        matrix = np.concatenate([matrix, fallback])
+    if not ids:
+        return []
+
+    query = np.asarray(embedding, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+    scores = (matrix @ query) / np.where(norms == 0.0, 1.0, norms)
+    keep = np.arange(len(ids)) if min_score is None else np.flatnonzero(scores >= min_score)
+    if len(keep) > top:
+        # Only the kept candidates need ordering
+        keep = keep[np.argpartition(-scores[keep], top - 1)[:top]]
+    order = keep[np.argsort(-scores[keep], kind="stable")]
+    return [(ids[i], float(scores[i])) for i in order]
+
+
+def _dumpb(obj: object) -> bytes:
+    try:
+        return orjson.dumps(obj)
+    except orjson.JSONEncodeError:
+        # orjson refuses what the stdlib encoder accepts, e.g. integers beyond 64 bits
+        return json.dumps(obj).encode()
+
+
+def _dumps(obj: object) -> str:
+    # orjson returns bytes; decode so SQLite stores TEXT (JSON1 rejects BLOB input)
+    return _dumpb(obj).decode()
+
+
+# 20+ digit runs may be integers past 64 bits, which orjson would turn into floats
+_LONG_NUMBER = re.compile(r"\d{20}")
 
 
-def _serialize_vector(v: list[float]) -> bytes:
-    return struct.pack(f"{len(v)}f", *v)
+def _loads_stdlib(text: str) -> object:
+    # NaN/Infinity (written by the stdlib encoder in older rows) read as null, which is
+    # how orjson writes them and the only form JSON responses can carry
+    return json.loads(text, parse_constant=lambda _: None)
+
+
+def _loads(text: str) -> object:
+    if _LONG_NUMBER.search(text):
+        return _loads_stdlib(text)
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        return _loads_stdlib(text)
 
 
 def _row_to_dict(row: sqlite3.Row) -> dict:
+    # Rows may come from a narrower projection (e.g. _DOC_COLS_LITE)
     d = dict(row)
-    d["tags"] = json.loads(d["tags"])
-    d["metadata"] = json.loads(d["metadata"])
+    if "tags" in d:
+        d["tags"] = _loads(d["tags"])
+    if "metadata" in d:
+        d["metadata"] = _loads(d["metadata"])
     return d
 
 
-def _matches_filters(doc: dict, tags: list[str], after: float | None, before: float | None,
-                     min_tokens: int | None, max_tokens: int | None) -> bool:
-    if tags and not any(t in doc["tags"] for t in tags):
-        return False
-    if after is not None and doc["created_at"] < after:
-        return False
-    if before is not None and doc["created_at"] > before:
-        return False
-    if min_tokens is not None and doc["token_count"] < min_tokens:
-        return False
-    if max_tokens is not None and doc["token_count"] > max_tokens:
-        return False
-    return True
+# Explicit projections instead of SELECT *; the lite one skips content and metadata for
+# index-style listings that only show titles/tags.
+_DOC_COLS = "id, content, title, tags, metadata, token_count, created_at, updated_at"
+_DOC_COLS_LITE = "id, title, tags, token_count, created_at, updated_at"
 
 
-# --- Sync DB operations (called via asyncio.to_thread) ---
+# --- Precompiled filter statements ---
+# Every combination of optional filters maps to a fixed SQL string (keyed by a bitmask of
+# which filters are set), so SQLite's per-connection statement cache always hits instead of
+# re-parsing a freshly concatenated query.
 
-def _sync_store(db_path: str, content: str, title: str | None, tags: list[str],
-                metadata: dict, embedding: list[float]) -> str:
-    conn = _get_or_create_conn(db_path)
-    doc_id = str(uuid.uuid4())
-    now = time()
-    token_count = _count_tokens(content)
-    conn.execute(
-        "INSERT INTO documents (id, content, title, tags, metadata, token_count, created_at, updated_at) "
-        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-        (doc_id, content, title, json.dumps(tags), json.dumps(metadata), token_count, now, now),
+_RANGE_FILTERS = ("created_at >= ?", "created_at <= ?", "token_count >= ?", "token_count <= ?")
+# Any-of tag match via the doc_tags index; the wanted tags are bound as one JSON array
+_TAG_FILTER = (
+    "id IN (SELECT doc_id FROM doc_tags WHERE tag IN (SELECT value FROM json_each(?)))"
+)
+# Index a document's tags from its JSON tags text
+_TAG_INSERT = "INSERT OR IGNORE INTO doc_tags (tag, doc_id) SELECT value, ? FROM json_each(?)"
+
+
+def _bind_filters(values: tuple) -> tuple[int, list]:
+    """Return the bitmask of filters that are set and their bind parameters, in order."""
+    mask, params = 0, []
+    for i, value in enumerate(values):
+        if value is not None:
+            mask |= 1 << i
+            params.append(value)
+    return mask, params
+
+
+def _knn_stmt(mask: int) -> str:
+    clauses = [c for i, c in enumerate(_RANGE_FILTERS) if mask >> i & 1]
+    where = "".join(f" AND {c}" for c in clauses)
+    return (
+        "SELECT doc_id FROM document_embeddings_i8 "
+        f"WHERE embedding MATCH vec_int8(?) AND k = ?{where} ORDER BY distance"
     )
-    conn.execute(
-        "INSERT INTO document_embeddings (doc_id, embedding) VALUES (?, ?)",
-        (doc_id, _serialize_vector(embedding)),
+
+
+def _list_stmt(mask: int, cols: str) -> str:
+    clauses = [c for i, c in enumerate(_RANGE_FILTERS + (_TAG_FILTER,)) if mask >> i & 1]
+    where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+    # id breaks created_at ties (a group commit stamps a whole flush with one time), matching
+    # the keyset order of _PAGE_STMTS so listing and streaming agree
+    return f"SELECT {cols} FROM documents {where} ORDER BY created_at DESC, id DESC LIMIT ?"
+
+
+_KNN_STMTS = {mask: _knn_stmt(mask) for mask in range(1 << len(_RANGE_FILTERS))}
+_LIST_STMTS = {
+    (mask, light): _list_stmt(mask, _DOC_COLS_LITE if light else _DOC_COLS)
+    for mask in range(1 << (len(_RANGE_FILTERS) + 1))
+    for light in (False, True)
+}
+
+
+def _page_stmt(mask: int) -> str:
+    # Keyset page: (created_at, id) breaks created_at ties so pages never skip or repeat rows
+    clauses = [c for i, c in enumerate(_RANGE_FILTERS + (_TAG_FILTER,)) if mask >> i & 1]
+    clauses.append("(created_at, id) < (?, ?)")
+    return (
+        f"SELECT {_DOC_COLS} FROM documents WHERE {' AND '.join(clauses)} "
+        "ORDER BY created_at DESC, id DESC LIMIT ?"
     )
-    conn.commit()
-    return doc_id
+
+
+_PAGE_STMTS = {mask: _page_stmt(mask) for mask in range(1 << (len(_RANGE_FILTERS) + 1))}
+
+
+# --- Sync DB operations (run on a Pool's reader/writer threads) ---
+
+def _sync_store_many(db_path: str, docs: list[dict], embeddings: list[_Vector],
+                     token_counts: list[int]) -> list[str]:
+    """Store many documents in a single transaction. Each doc has content/title/tags/metadata."""
+    if len(docs) != len(embeddings):
+        raise ValueError(f"got {len(docs)} docs but {len(embeddings)} embeddings")
+    now = time()
+    doc_ids = [_uuid7() for _ in docs]
+    tags_json = [_dumps(d.get("tags") or []) for d in docs]
+    pool = _get_pool(db_path)
+    with pool.writer() as conn:
+        conn.executemany(
+            "INSERT INTO documents (id, content, title, tags, metadata, token_count, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(doc_id, d["content"], d.get("title"), tags,
+              _dumps(d.get("metadata") or {}), token_count, now, now)
+             for doc_id, d, tags, token_count in zip(doc_ids, docs, tags_json, token_counts)],
+        )
+        conn.executemany(_TAG_INSERT, zip(doc_ids, tags_json))
+        _insert_embeddings(conn, pool.vectors, [
+            (doc_id, _serialize_vector(embedding), now, token_count)
+            for doc_id, embedding, token_count in zip(doc_ids, embeddings, token_counts)
+        ])
+    return doc_ids
 
 
 def _sync_update(db_path: str, doc_id: str, content: str | None, title: str | None,
                  tags: list[str] | None, metadata: dict | None,
-                 embedding: list[float] | None) -> dict | None:
-    conn = _get_or_create_conn(db_path)
-    row = conn.execute("SELECT * FROM documents WHERE id = ?", (doc_id,)).fetchone()
-    if row is None:
-        return None
-    existing = _row_to_dict(row)
-
-    new_content = content if content is not None else existing["content"]
-    new_title = title if title is not None else existing["title"]
-    new_tags = tags if tags is not None else existing["tags"]
-    new_metadata = metadata if metadata is not None else existing["metadata"]
-    new_token_count = _count_tokens(new_content) if content is not None else existing["token_count"]
+                 embedding: _Vector | None, token_count: int | None) -> dict | None:
+    pool = _get_pool(db_path)
+    with pool.writer() as conn:
+        row = conn.execute(f"SELECT {_DOC_COLS} FROM documents WHERE id = ?", (doc_id,)).fetchone()
+        if row is None:
+            return None
+
+        # Unchanged tags/metadata are written back as the stored JSON text, never decoded
+        new_content = content if content is not None else row["content"]
+        new_title = title if title is not None else row["title"]
+        new_tags = _dumps(tags) if tags is not None else row["tags"]
+        new_metadata = _dumps(metadata) if metadata is not None else row["metadata"]
+        new_token_count = token_count if content is not None else row["token_count"]
 
-    conn.execute(
-        "UPDATE documents SET content=?, title=?, tags=?, metadata=?, token_count=?, updated_at=? WHERE id=?",
-        (new_content, new_title, json.dumps(new_tags), json.dumps(new_metadata), new_token_count, time(), doc_id),
-    )
-    if embedding is not None:
-        conn.execute("DELETE FROM document_embeddings WHERE doc_id = ?", (doc_id,))
         conn.execute(
-            "INSERT INTO document_embeddings (doc_id, embedding) VALUES (?, ?)",
-            (doc_id, _serialize_vector(embedding)),
+            "UPDATE documents SET content=?, title=?, tags=?, metadata=?, token_count=?, updated_at=? WHERE id=?",
+            (new_content, new_title, new_tags, new_metadata, new_token_count, time(), doc_id),
         )
-    conn.commit()
-    updated = conn.execute("SELECT * FROM documents WHERE id = ?", (doc_id,)).fetchone()
+        if tags is not None:
+            conn.execute("DELETE FROM doc_tags WHERE doc_id = ?", (doc_id,))
+            conn.execute(_TAG_INSERT, (doc_id, new_tags))
+        if embedding is not None:
+            _replace_embedding(conn, pool.vectors, doc_id, _serialize_vector(embedding),
+                               row["created_at"], new_token_count)
+        elif content is not None:
+            conn.execute(
+                "UPDATE document_embeddings_i8 SET token_count = ? WHERE doc_id = ?",
+                (new_token_count, doc_id),
+            )
+        updated = conn.execute(f"SELECT {_DOC_COLS} FROM documents WHERE id = ?", (doc_id,)).fetchone()
     return _row_to_dict(updated)
 
 
-def _sync_search(db_path: str, embedding: list[float], limit: int, min_score: float | None,
+def _sync_search(db_path: str, embedding: _Vector, limit: int, min_score: float | None,
                  tags: list[str], after: float | None, before: float | None,
                  min_tokens: int | None, max_tokens: int | None) -> list[dict]:
-    conn = _get_or_create_conn(db_path)
-    has_filters = bool(tags) or after or before or min_tokens or max_tokens
-    rows = conn.execute(
-        "SELECT de.doc_id, de.distance "
-        "FROM document_embeddings de "
-        "WHERE de.embedding MATCH ? AND k = ? "
-        "ORDER BY de.distance",
-        (_serialize_vector(embedding), limit * 5 if has_filters else limit),
-    ).fetchall()
+    # Date/token filters are evaluated inside the vec0 KNN scan; the tag filter (any-of
+    # over a JSON list) runs on the candidate lookup and needs extra candidates.
+    fetch = limit * 5 if tags else limit
+    mask, params = _bind_filters(
+        (None if after is None else float(after), None if before is None else float(before),
+         min_tokens, max_tokens)
+    )
 
+    pool = _get_pool(db_path)
+    with pool.reader() as conn:
+        # First pass over the INT8 index, then exact FP32 rerank of the oversampled candidates
+        rows = conn.execute(
+            _KNN_STMTS[mask],
+            [_quantize_vector(embedding), min(fetch * _RERANK_OVERSAMPLE, _VEC0_MAX_K), *params],
+        ).fetchall()
+        ranked = _rerank(conn, pool.vectors, [row["doc_id"] for row in rows], embedding,
+                         fetch, min_score)
+
+        # One batched lookup for all candidates; the id list is bound as a single JSON
+        # array so the statement text stays constant regardless of candidate count.
+        # Tag matching happens here too, so rows that fail it are never decoded.
+        sql = f"SELECT {_DOC_COLS} FROM documents WHERE id IN (SELECT value FROM json_each(?))"
+        doc_params = [_dumps([doc_id for doc_id, _ in ranked])]
+        if tags:
+            sql += f" AND {_TAG_FILTER}"
+            doc_params.append(_dumps(tags))
+        doc_rows = conn.execute(sql, doc_params).fetchall()
+    by_id = {row["id"]: row for row in doc_rows}
+
+    # Only the rows actually returned pay for tags/metadata JSON decoding
     results = []
-    for row in rows:
-        doc_id, distance = row["doc_id"], row["distance"]
-        score = 1.0 - distance
-        if min_score is not None and score < min_score:
-            continue
-        doc_row = conn.execute(
-            "SELECT * FROM documents WHERE id = ?", (doc_id,)
-        ).fetchone()
+    for doc_id, score in ranked:
+        doc_row = by_id.get(doc_id)
         if doc_row is None:
             continue
-        doc = _row_to_dict(doc_row)
-        if not _matches_filters(doc, tags, after, before, min_tokens, max_tokens):
-            continue
-        results.append({"document": doc, "score": score})
+        results.append({"document": _row_to_dict(doc_row), "score": score})
         if len(results) >= limit:
             break
     return results
 
 
-def _sync_get(db_path: str, doc_id: str) -> dict | None:
-    conn = _get_or_create_conn(db_path)
-    row = conn.execute("SELECT * FROM documents WHERE id = ?", (doc_id,)).fetchone()
+def _sync_get(db_path: str, doc_id: str, light: bool = False) -> dict | None:
+    cols = _DOC_COLS_LITE if light else _DOC_COLS
+    with _get_pool(db_path).reader() as conn:
+        row = conn.execute(f"SELECT {cols} FROM documents WHERE id = ?", (doc_id,)).fetchone()
     return _row_to_dict(row) if row else None
 
 
 def _sync_delete(db_path: str, doc_id: str) -> bool:
-    conn = _get_or_create_conn(db_path)
-    cur = conn.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
-    conn.execute("DELETE FROM document_embeddings WHERE doc_id = ?", (doc_id,))
-    conn.commit()
+    pool = _get_pool(db_path)
+    with pool.writer() as conn:
+        cur = conn.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
+        conn.execute("DELETE FROM doc_tags WHERE doc_id = ?", (doc_id,))
+        _delete_embedding(conn, pool.vectors, doc_id)
     return cur.rowcount > 0
 
 
 def _sync_copy(src_path: str, doc_id: str, dst_path: str) -> str | None:
     """Copy a document to another DB, reusing raw embedding bytes (no re-embedding)."""
-    conn_src = _get_or_create_conn(src_path)
-    conn_dst = _get_or_create_conn(dst_path)
+    with _get_pool(src_path).reader() as conn_src:
+        row = conn_src.execute(f"SELECT {_DOC_COLS} FROM documents WHERE id = ?", (doc_id,)).fetchone()
+        if row is None:
+            return None
 
-    row = conn_src.execute("SELECT * FROM documents WHERE id = ?", (doc_id,)).fetchone()
-    if row is None:
-        return None
-    doc = _row_to_dict(row)
-
-    emb_row = conn_src.execute(
-        "SELECT embedding FROM document_embeddings WHERE doc_id = ?", (doc_id,)
-    ).fetchone()
+        emb_row = conn_src.execute(
+            "SELECT embedding FROM document_embeddings WHERE doc_id = ?", (doc_id,)
+        ).fetchone()
     if emb_row is None:
         return None
     embedding_bytes = emb_row["embedding"]
 
-    new_id = str(uuid.uuid4())
+    new_id = _uuid7()
     now = time()
-    conn_dst.execute(
-        "INSERT INTO documents (id, content, title, tags, metadata, token_count, created_at, updated_at) "
-        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-        (new_id, doc["content"], doc["title"], json.dumps(doc["tags"]),
-         json.dumps(doc["metadata"]), doc["token_count"], now, now),
-    )
-    conn_dst.execute(
-        "INSERT INTO document_embeddings (doc_id, embedding) VALUES (?, ?)",
-        (new_id, embedding_bytes),
-    )
-    conn_dst.commit()
+    pool = _get_pool(dst_path)
+    with pool.writer() as conn_dst:
+        conn_dst.execute(
+            "INSERT INTO documents (id, content, title, tags, metadata, token_count, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (new_id, row["content"], row["title"], row["tags"],
+             row["metadata"], row["token_count"], now, now),
+        )
+        conn_dst.execute(_TAG_INSERT, (new_id, row["tags"]))
+        _insert_embeddings(conn_dst, pool.vectors,
+                           [(new_id, embedding_bytes, now, row["token_count"])])
     return new_id
 
 
@@ -249,140 +896,233 @@ def _sync_move(src_path: str, doc_id: str, dst_path: str) -> str | None:
 
 
 def _sync_list(db_path: str, tags: list[str], limit: int, after: float | None,
-               before: float | None, min_tokens: int | None, max_tokens: int | None) -> list[dict]:
-    conn = _get_or_create_conn(db_path)
-
-    # Build SQL WHERE clauses for indexed columns (dates, token_count)
-    clauses, params = [], []
-    if after is not None:
-        clauses.append("created_at >= ?")
-        params.append(after)
-    if before is not None:
-        clauses.append("created_at <= ?")
-        params.append(before)
-    if min_tokens is not None:
-        clauses.append("token_count >= ?")
-        params.append(min_tokens)
-    if max_tokens is not None:
-        clauses.append("token_count <= ?")
-        params.append(max_tokens)
-
-    where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
-    fetch_limit = limit * 3 if tags else limit
-    params.append(fetch_limit)
+               before: float | None, min_tokens: int | None, max_tokens: int | None,
+               light: bool = False) -> list[dict]:
+    mask, params = _bind_filters(
+        (after, before, min_tokens, max_tokens, _dumps(tags) if tags else None)
+    )
+    params.append(limit)
+    with _get_pool(db_path).reader() as conn:
+        rows = conn.execute(_LIST_STMTS[mask, light], params).fetchall()
+    return [_row_to_dict(row) for row in rows]
 
-    rows = conn.execute(
-        f"SELECT * FROM documents {where} ORDER BY created_at DESC LIMIT ?", params
-    ).fetchall()
 
-    results = []
-    for row in rows:
-        doc = _row_to_dict(row)
-        if tags and not any(t in doc["tags"] for t in tags):
-            continue
-        results.append(doc)
-        if len(results) >= limit:
-            break
-    return results
+def _sync_list_page(db_path: str, tags: list[str], after: float | None, before: float | None,
+                    min_tokens: int | None, max_tokens: int | None,
+                    cursor: tuple[float, str], size: int) -> list[dict]:
+    mask, params = _bind_filters(
+        (after, before, min_tokens, max_tokens, _dumps(tags) if tags else None)
+    )
+    params.extend((*cursor, size))
+    with _get_pool(db_path).reader() as conn:
+        rows = conn.execute(_PAGE_STMTS[mask], params).fetchall()
+    return [_row_to_dict(row) for row in rows]
+
+
+# --- Group commit for single stores ---
+
+class _StoreQueue:
+    """Collects db.store calls for one DB and writes them together.
+
+    Stores arriving within ``store_batch_window_ms`` (or until ``store_batch_max`` are
+    queued) go through one _sync_store_many call — one transaction, one WAL commit — and
+    each caller's future gets its own id. Lives on the event loop; only the write itself
+    runs on the DB's writer thread.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._pending: list[tuple[dict, _Vector, int, asyncio.Future]] = []
+        self._handle: asyncio.TimerHandle | None = None
+
+    def add(self, doc: dict, embedding: _Vector, token_count: int) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._pending.append((doc, embedding, token_count, fut))
+        if len(self._pending) >= settings.store_batch_max:
+            self._flush()
+        elif self._handle is None:
+            self._handle = loop.call_later(settings.store_batch_window_ms / 1000, self._flush)
+        return fut
+
+    def _flush(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        batch, self._pending = self._pending, []
+        task = asyncio.get_running_loop().create_task(self._write(batch))
+        _store_tasks.add(task)
+        task.add_done_callback(_store_tasks.discard)
+
+    async def _write(self, batch: list[tuple[dict, _Vector, int, asyncio.Future]]) -> None:
+        docs, vectors, counts, futures = (list(col) for col in zip(*batch))
+        try:
+            results: list = await _run_write(
+                self.path, _sync_store_many, self.path, docs, vectors, counts
+            )
+        except Exception as e:
+            if len(batch) > 1:
+                # Don't let one bad document fail everyone it was batched with
+                for item in batch:
+                    await self._write([item])
+                return
+            results = [e]
+        for fut, result in zip(futures, results):
+            if fut.done():  # caller was cancelled; the row is stored regardless
+                continue
+            if isinstance(result, Exception):
+                fut.set_exception(result)
+            else:
+                fut.set_result(result)
+
+
+_store_queues: dict[str, _StoreQueue] = {}
+_store_tasks: set[asyncio.Task] = set()
 
 
 # --- Async wrappers ---
 
 async def store(db_path: str | None, content: str, title: str | None,
-                tags: list[str], metadata: dict, embedding: list[float]) -> str:
+                tags: list[str], metadata: dict, embedding: _Vector) -> str:
+    path = _resolve_path(db_path)
+    token_count = await _count_tokens_async(content)
+    queue = _store_queues.get(path)
+    if queue is None:
+        queue = _store_queues[path] = _StoreQueue(path)
+    doc = {"content": content, "title": title, "tags": tags, "metadata": metadata}
+    return await queue.add(doc, embedding, token_count)
+
+
+async def store_many(db_path: str | None, docs: list[dict],
+                     embeddings: list[_Vector]) -> list[str]:
     path = _resolve_path(db_path)
-    return await asyncio.to_thread(_sync_store, path, content, title, tags, metadata, embedding)
+    token_counts = await asyncio.to_thread(_count_tokens_batch, [d["content"] for d in docs])
+    return await _run_write(path, _sync_store_many, path, docs, embeddings, token_counts)
 
 
-async def search(db_path: str | None, embedding: list[float], limit: int,
+async def search(db_path: str | None, embedding: _Vector, limit: int,
                  min_score: float | None, tags: list[str], after: float | None,
                  before: float | None, min_tokens: int | None, max_tokens: int | None) -> list[dict]:
     path = _resolve_path(db_path)
-    return await asyncio.to_thread(
-        _sync_search, path, embedding, limit, min_score, tags, after, before, min_tokens, max_tokens
+    return await _run_read(
+        path, _sync_search, path, embedding, limit, min_score, tags, after, before, min_tokens, max_tokens
     )
 
 
-async def get(db_path: str | None, doc_id: str) -> dict | None:
+async def get(db_path: str | None, doc_id: str, light: bool = False) -> dict | None:
     path = _resolve_path(db_path)
-    return await asyncio.to_thread(_sync_get, path, doc_id)
+    return await _run_read(path, _sync_get, path, doc_id, light)
 
 
 async def update(db_path: str | None, doc_id: str, content: str | None, title: str | None,
                  tags: list[str] | None, metadata: dict | None,
-                 embedding: list[float] | None) -> dict | None:
+                 embedding: _Vector | None) -> dict | None:
     path = _resolve_path(db_path)
-    return await asyncio.to_thread(_sync_update, path, doc_id, content, title, tags, metadata, embedding)
+    token_count = await _count_tokens_async(content) if content is not None else None
+    return await _run_write(path, _sync_update, path, doc_id, content, title, tags, metadata,
+                            embedding, token_count)
 
 
 async def delete(db_path: str | None, doc_id: str) -> bool:
     path = _resolve_path(db_path)
-    return await asyncio.to_thread(_sync_delete, path, doc_id)
+    return await _run_write(path, _sync_delete, path, doc_id)
 
 
 async def list_docs(db_path: str | None, tags: list[str], limit: int, after: float | None,
-                    before: float | None, min_tokens: int | None, max_tokens: int | None) -> list[dict]:
+                    before: float | None, min_tokens: int | None, max_tokens: int | None,
+                    light: bool = False) -> list[dict]:
+    """List newest-first. light=True skips content/metadata (see _DOC_COLS_LITE)."""
     path = _resolve_path(db_path)
-    return await asyncio.to_thread(_sync_list, path, tags, limit, after, before, min_tokens, max_tokens)
+    return await _run_read(
+        path, _sync_list, path, tags, limit, after, before, min_tokens, max_tokens, light
+    )
+
+
+async def iter_docs(db_path: str | None, tags: list[str], limit: int | None,
+                    after: float | None, before: float | None, min_tokens: int | None,
+                    max_tokens: int | None, page_size: int = 100) -> AsyncIterator[dict]:
+    """Yield documents newest-first like list_docs (limit=None for all), a page at a time.
+
+    Each page is its own short read, so memory stays at one page and no read transaction
+    is held open while the caller consumes rows.
+    """
+    path = _resolve_path(db_path)
+    cursor = (float("inf"), "")
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = page_size if remaining is None else min(page_size, remaining)
+        page = await _run_read(path, _sync_list_page, path, tags, after, before,
+                               min_tokens, max_tokens, cursor, size)
+        for doc in page:
+            yield doc
+        if len(page) < size:
+            return
+        if remaining is not None:
+            remaining -= len(page)
+        cursor = (page[-1]["created_at"], page[-1]["id"])
 
 
 async def search_multi(
-    paths: list[str], embedding: list[float], limit: int, min_score: float | None,
+    paths: list[str], embedding: _Vector, limit: int, min_score: float | None,
     tags: list[str], after: float | None, before: float | None,
     min_tokens: int | None, max_tokens: int | None,
 ) -> list[dict]:
     """Search multiple DBs concurrently, merge by score, deduplicate by doc id."""
     tasks = [
-        asyncio.to_thread(_sync_search, p, embedding, limit, min_score, tags, after, before, min_tokens, max_tokens)
+        _run_read(p, _sync_search, p, embedding, limit, min_score, tags, after, before,
+                  min_tokens, max_tokens)
         for p in paths
     ]
     per_db = await asyncio.gather(*tasks, return_exceptions=True)
+    # Each per-DB list is already best-first, so a k-way merge yields the top `limit`
+    # without sorting everything
+    ranked = [r for r in per_db if not isinstance(r, Exception)]
     seen: set[str] = set()
     merged: list[dict] = []
-    for result in per_db:
-        if isinstance(result, Exception):
-            continue
-        for item in result:
-            doc_id = item["document"]["id"]
-            if doc_id not in seen:
-                seen.add(doc_id)
-                merged.append(item)
-    merged.sort(key=lambda x: x["score"], reverse=True)
-    return merged[:limit]
+    for item in heapq.merge(*ranked, key=lambda x: x["score"], reverse=True):
+        doc_id = item["document"]["id"]
+        if doc_id not in seen:
+            seen.add(doc_id)
+            merged.append(item)
+            if len(merged) >= limit:
+                break
+    return merged
 
 
 async def copy(from_db_path: str | None, doc_id: str, to_db_path: str | None) -> str | None:
     src = _resolve_path(from_db_path)
     dst = _resolve_path(to_db_path)
-    return await asyncio.to_thread(_sync_copy, src, doc_id, dst)
+    return await _run_write(dst, _sync_copy, src, doc_id, dst)
 
 
 async def move(from_db_path: str | None, doc_id: str, to_db_path: str | None) -> str | None:
     src = _resolve_path(from_db_path)
     dst = _resolve_path(to_db_path)
-    return await asyncio.to_thread(_sync_move, src, doc_id, dst)
+    return await _run_write(dst, _sync_move, src, doc_id, dst)
 
 
 def _sync_recount_tokens(db_path: str) -> dict:
     """Recalculate token_count for docs where token_count=0 but content is non-empty."""
-    conn = _get_or_create_conn(db_path)
-    rows = conn.execute(
-        "SELECT id, content FROM documents WHERE token_count = 0 AND content != ''"
-    ).fetchall()
-    updated = 0
-    for row in rows:
-        count = _count_tokens(row["content"])
-        if count > 0:
-            conn.execute("UPDATE documents SET token_count = ? WHERE id = ?", (count, row["id"]))
-            updated += 1
-    if updated:
-        conn.commit()
+    with _get_pool(db_path).writer() as conn:
+        rows = conn.execute(
+            "SELECT id, content FROM documents WHERE token_count = 0 AND content != ''"
+        ).fetchall()
+        updated = 0
+        counts = _count_tokens_batch([row["content"] for row in rows])
+        for row, count in zip(rows, counts):
+            if count > 0:
+                conn.execute("UPDATE documents SET token_count = ? WHERE id = ?", (count, row["id"]))
+                conn.execute(
+                    "UPDATE document_embeddings_i8 SET token_count = ? WHERE doc_id = ?",
+                    (count, row["id"]),
+                )
+                updated += 1
     return {"fixed": updated, "scanned": len(rows)}
 
 
 async def recount_tokens(db_path: str | None) -> dict:
     path = _resolve_path(db_path)
-    return await asyncio.to_thread(_sync_recount_tokens, path)
+    return await _run_write(path, _sync_recount_tokens, path)
 
 
 async def list_docs_multi(
@@ -391,18 +1131,18 @@ async def list_docs_multi(
 ) -> list[dict]:
     """List documents from multiple DBs, merge by created_at desc, deduplicate by doc id."""
     tasks = [
-        asyncio.to_thread(_sync_list, p, tags, limit, after, before, min_tokens, max_tokens)
+        _run_read(p, _sync_list, p, tags, limit, after, before, min_tokens, max_tokens)
         for p in paths
     ]
     per_db = await asyncio.gather(*tasks, return_exceptions=True)
+    # Each per-DB list is already newest-first; k-way merge instead of a full sort
+    ranked = [r for r in per_db if not isinstance(r, Exception)]
     seen: set[str] = set()
     merged: list[dict] = []
-    for result in per_db:
-        if isinstance(result, Exception):
-            continue
-        for doc in result:
-            if doc["id"] not in seen:
-                seen.add(doc["id"])
-                merged.append(doc)
-    merged.sort(key=lambda x: x["created_at"], reverse=True)
-    return merged[:limit]
+    for doc in heapq.merge(*ranked, key=lambda x: (x["created_at"], x["id"]), reverse=True):
+        if doc["id"] not in seen:
+            seen.add(doc["id"])
+            merged.append(doc)
+            if len(merged) >= limit:
+                break
+    return merged
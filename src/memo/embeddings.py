@@ -1,25 +1,201 @@
+import asyncio
+import base64
+import hashlib
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
 from openai import AsyncOpenAI
 from memo.config import settings
 
+log = logging.getLogger(__name__)
+
 _client = AsyncOpenAI(
     api_key=settings.openrouter_api_key,
     base_url="https://openrouter.ai/api/v1",
 )
 
+# LRU of recent embeddings, and futures for texts queued or already on the wire so
+# concurrent callers embedding the same text share one API call. Returned vectors are
+# shared (read-only float32 arrays) — callers must not mutate them.
+_cache: OrderedDict[str, np.ndarray] = OrderedDict()
+_inflight: dict[str, asyncio.Future] = {}
+_tasks: set[asyncio.Task] = set()
 
-async def embed(text: str) -> list[float]:
-    response = await _client.embeddings.create(
-        model=settings.embedding_model,
-        input=text,
-        dimensions=settings.embedding_dimensions,
-    )
-    return response.data[0].embedding
+# Texts waiting for the current batch window to close (key → text)
+_pending: dict[str, str] = {}
+_flush_handle: asyncio.TimerHandle | None = None
+
+
+def _key(text: str) -> str:
+    digest = hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+    return f"{settings.embedding_model}:{settings.embedding_dimensions}:{digest}"
+
+
+def _cache_get(key: str) -> np.ndarray | None:
+    vec = _cache.get(key)
+    if vec is not None:
+        _cache.move_to_end(key)
+    return vec
+
+
+def _cache_put(key: str, vec: np.ndarray) -> None:
+    _cache[key] = vec
+    _cache.move_to_end(key)
+    while len(_cache) > settings.embedding_cache_size:
+        _cache.popitem(last=False)
+
+
+def _key_prefix() -> str:
+    return f"{settings.embedding_model}:{settings.embedding_dimensions}:"
+
+
+def load_cache() -> int:
+    """Warm the LRU from the on-disk snapshot written by save_cache. Returns entries loaded."""
+    path = settings.resolved_embedding_cache_file
+    if settings.embedding_cache_size <= 0 or not os.path.exists(path):
+        return 0
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            keys, vectors = data["keys"].tolist(), data["vectors"]
+    except Exception as e:
+        # Corrupt or partly written snapshot: start cold rather than fail startup
+        log.warning("ignoring unreadable embedding cache %s: %s", path, e)
+        return 0
+    prefix = _key_prefix()
+    loaded = 0
+    for key, vec in zip(keys, vectors):
+        if key.startswith(prefix):
+            _cache_put(key, vec)
+            loaded += 1
+    return loaded
 
 
-async def embed_batch(texts: list[str]) -> list[list[float]]:
+def save_cache() -> None:
+    """Snapshot the LRU (oldest first) so the next process starts warm."""
+    prefix = _key_prefix()
+    items = [(k, v) for k, v in _cache.items() if k.startswith(prefix)]
+    if settings.embedding_cache_size <= 0 or not items:
+        return
+    path = Path(settings.resolved_embedding_cache_file)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Own temp file per writer: with several workers each saves at shutdown, and the last
+    # complete snapshot to be renamed in wins
+    with tempfile.NamedTemporaryFile(dir=path.parent, prefix=path.name + ".",
+                                     suffix=".tmp", delete=False) as f:
+        try:
+            np.savez(f, keys=np.array([k for k, _ in items]),
+                     vectors=np.array([v for _, v in items], dtype=np.float32))
+        except BaseException:
+            f.close()
+            os.unlink(f.name)
+            raise
+    os.replace(f.name, path)
+
+
+def _to_array(embedding: str | list[float]) -> np.ndarray:
+    # base64 is the raw little-endian float32 buffer; some providers ignore
+    # encoding_format and send a float list instead
+    if isinstance(embedding, str):
+        return np.frombuffer(base64.b64decode(embedding), dtype=np.float32)
+    return np.asarray(embedding, dtype=np.float32)
+
+
+async def _create(texts: list[str]) -> list[np.ndarray]:
+    # Ask for base64 explicitly so the SDK hands back the packed buffer instead of
+    # expanding it into a list of Python floats
     response = await _client.embeddings.create(
         model=settings.embedding_model,
         input=texts,
         dimensions=settings.embedding_dimensions,
+        encoding_format="base64",
     )
-    return [item.embedding for item in response.data]
+    return [_to_array(item.embedding) for item in sorted(response.data, key=lambda d: d.index)]
+
+
+async def _resolve(futures: dict[str, asyncio.Future], texts: list[str]) -> None:
+    try:
+        vectors = await _create(texts)
+        if len(vectors) != len(texts):
+            raise RuntimeError(
+                f"embeddings API returned {len(vectors)} vectors for {len(texts)} inputs"
+            )
+    except Exception as e:
+        if len(texts) > 1:
+            # The API fails the whole request for one bad input (e.g. over the context
+            # length); retry each text alone so only that text's callers get the error
+            await asyncio.gather(*(
+                _resolve({key: fut}, [text]) for (key, fut), text in zip(futures.items(), texts)
+            ))
+            return
+        for fut in futures.values():
+            fut.set_exception(e)
+    else:
+        for (key, fut), vec in zip(futures.items(), vectors):
+            _cache_put(key, vec)
+            fut.set_result(vec)
+    finally:
+        for key in futures:
+            _inflight.pop(key, None)
+
+
+def _flush() -> None:
+    """Send everything queued so far, at most embedding_max_batch texts per API call."""
+    global _flush_handle
+    if _flush_handle is not None:
+        _flush_handle.cancel()
+        _flush_handle = None
+    items = list(_pending.items())
+    _pending.clear()
+    loop = asyncio.get_running_loop()
+    step = settings.embedding_max_batch
+    for i in range(0, len(items), step):
+        chunk = items[i:i + step]
+        futures = {key: _inflight[key] for key, _ in chunk}
+        task = loop.create_task(_resolve(futures, [text for _, text in chunk]))
+        _tasks.add(task)
+        task.add_done_callback(_tasks.discard)
+
+
+def _enqueue(missing: dict[str, str]) -> None:
+    """Queue key→text pairs for the next batched API call, registering an in-flight future
+    per key. Calls arriving within embedding_batch_window_ms share one request."""
+    global _flush_handle
+    loop = asyncio.get_running_loop()
+    for key, text in missing.items():
+        _inflight[key] = loop.create_future()
+        _pending[key] = text
+    if len(_pending) >= settings.embedding_max_batch:
+        _flush()
+    elif _flush_handle is None:
+        _flush_handle = loop.call_later(settings.embedding_batch_window_ms / 1000, _flush)
+
+
+async def embed(text: str) -> np.ndarray:
+    return (await embed_batch([text]))[0]
+
+
+async def embed_batch(texts: list[str]) -> list[np.ndarray]:
+    keys = [_key(t) for t in texts]
+    vectors: dict[str, np.ndarray] = {}
+    missing: dict[str, str] = {}
+    for key, text in zip(keys, texts):
+        if key in vectors or key in missing:
+            continue
+        vec = _cache_get(key)
+        if vec is not None:
+            vectors[key] = vec
+        elif key not in _inflight:
+            missing[key] = text
+    if missing:
+        _enqueue(missing)
+
+    waiting = [key for key in dict.fromkeys(keys) if key not in vectors]
+    if waiting:
+        # shield so one cancelled caller doesn't cancel the request for everyone sharing it
+        results = await asyncio.gather(*(asyncio.shield(_inflight[key]) for key in waiting))
+        vectors.update(zip(waiting, results))
+    return [vectors[key] for key in keys]
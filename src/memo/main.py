@@ -4,15 +4,18 @@ from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Any
 
+import orjson
 import uvicorn
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from mcp.server.fastmcp import FastMCP
 
 from memo import db, embeddings
 from memo.config import settings
-from memo.db import _count_tokens
+from memo.db import _count_tokens, _dumpb
+from memo.middleware import MsgpackMiddleware
 from memo.models import (
     AutoStoreRequest,
     AutoStoreResponse,
@@ -24,6 +27,8 @@ from memo.models import (
     Document,
     SearchRequest,
     SearchResult,
+    StoreBatchRequest,
+    StoreBatchResponse,
     StoreRequest,
     StoreResponse,
     UpdateRequest,
@@ -329,8 +334,10 @@ async def memo_context(
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    embeddings.load_cache()
     async with mcp.session_manager.run():
         yield
+    embeddings.save_cache()
 
 
 app = FastAPI(title="memo", lifespan=lifespan)
@@ -341,6 +348,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MsgpackMiddleware)
 
 app.mount("/mcp", mcp_starlette)
 
@@ -369,6 +377,45 @@ async def store_document(req: StoreRequest):
     return StoreResponse(id=doc_id)
 
 
+@app.post("/documents/batch", response_model=StoreBatchResponse)
+async def store_documents_batch(req: StoreBatchRequest, response: Response):
+    """Store many documents: one embeddings request for all items, then one transaction
+    per target DB.
+
+    Each DB commits or fails on its own, so the result is reported per item: a failed
+    DB's items get a null id and an error, and the response is 207 when only some failed.
+    """
+    vectors = await embeddings.embed_batch([item.content for item in req.items])
+    groups: dict[str | None, list[int]] = {}
+    for i, item in enumerate(req.items):
+        groups.setdefault(item.db_path, []).append(i)
+
+    fields = {"content", "title", "tags", "metadata"}
+    per_db = await asyncio.gather(*[
+        db.store_many(
+            db_path=db_path,
+            docs=[req.items[i].model_dump(include=fields) for i in idx],
+            embeddings=[vectors[i] for i in idx],
+        )
+        for db_path, idx in groups.items()
+    ], return_exceptions=True)
+    failed = [r for r in per_db if isinstance(r, BaseException)]
+    if failed and len(failed) == len(per_db):
+        raise failed[0]  # nothing was written; a plain retry is safe
+
+    ids: list[str | None] = [None] * len(req.items)
+    errors: list[str | None] = [None] * len(req.items)
+    for idx, result in zip(groups.values(), per_db):
+        for n, i in enumerate(idx):
+            if isinstance(result, BaseException):
+                errors[i] = f"{type(result).__name__}: {result}"
+            else:
+                ids[i] = result[n]
+    if failed:
+        response.status_code = 207
+    return StoreBatchResponse(ids=ids, errors=errors)
+
+
 @app.get("/documents", response_model=list[Document])
 async def list_documents(
     query: str | None = Query(default=None),
@@ -381,18 +428,41 @@ async def list_documents(
     limit: int = Query(default=100),
     db_path: str | None = Query(default=None),
 ):
+    # DB rows already have Document's shape; return them as-is and let response_model
+    # validate and serialize once instead of building a model per row here first
     if query is not None:
         embedding = await embeddings.embed(query)
         results = await db.search(
             db_path=db_path, embedding=embedding, limit=limit, min_score=min_score,
             tags=tags, after=after, before=before, min_tokens=min_tokens, max_tokens=max_tokens,
         )
-        return [Document(**r["document"]) for r in results]
+        return [r["document"] for r in results]
     docs = await db.list_docs(
         db_path=db_path, tags=tags, limit=limit,
         after=after, before=before, min_tokens=min_tokens, max_tokens=max_tokens,
     )
-    return [Document(**d) for d in docs]
+    return docs
+
+
+@app.get("/documents/stream")
+async def stream_documents(
+    tags: list[str] = Query(default=[]),
+    after: float | None = Query(default=None),
+    before: float | None = Query(default=None),
+    min_tokens: int | None = Query(default=None),
+    max_tokens: int | None = Query(default=None),
+    limit: int | None = Query(default=None),
+    db_path: str | None = Query(default=None),
+):
+    """List documents newest-first as NDJSON, one memo per line, read from the DB page by page."""
+    docs = db.iter_docs(db_path=db_path, tags=tags, limit=limit, after=after, before=before,
+                        min_tokens=min_tokens, max_tokens=max_tokens)
+
+    async def lines():
+        async for doc in docs:
+            yield _dumpb(doc) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 
 @app.get("/documents/{doc_id}", response_model=Document)
@@ -400,7 +470,7 @@ async def get_document(doc_id: str, db_path: str | None = Query(default=None)):
     doc = await db.get(db_path=db_path, doc_id=doc_id)
     if doc is None:
         raise HTTPException(status_code=404, detail="Document not found")
-    return Document(**doc)
+    return doc
 
 
 @app.patch("/documents/{doc_id}", response_model=Document)
@@ -417,7 +487,7 @@ async def update_document(doc_id: str, req: UpdateRequest):
     )
     if result is None:
         raise HTTPException(status_code=404, detail="Memo not found")
-    return Document(**result)
+    return result
 
 
 @app.delete("/documents/{doc_id}", response_model=DeleteResponse)
@@ -456,7 +526,7 @@ async def search_documents(req: SearchRequest):
         min_tokens=req.min_tokens,
         max_tokens=req.max_tokens,
     )
-    return [SearchResult(document=Document(**r["document"]), score=r["score"]) for r in results]
+    return results
 
 
 @app.get("/index")
@@ -465,10 +535,10 @@ async def index_documents(
     limit: int = Query(default=200),
 ):
     docs = await db.list_docs(db_path=db_path, tags=[], limit=limit, after=None, before=None,
-                               min_tokens=None, max_tokens=None)
-    return [{"id": d["id"], "title": d["title"], "tags": d["tags"],
-             "created_at": d["created_at"], "updated_at": d["updated_at"],
-             "token_count": d["token_count"]} for d in docs]
+                               min_tokens=None, max_tokens=None, light=True)
+    # Light rows already hold exactly the index fields; without a response_model FastAPI
+    # would walk them through jsonable_encoder, so serialize directly
+    return Response(orjson.dumps(docs), media_type="application/json")
 
 
 @app.post("/admin/recount-tokens")
@@ -577,7 +647,10 @@ async def context_documents(req: ContextRequest):
 
 
 def main():
-    uvicorn.run("memo.main:app", host="0.0.0.0", port=settings.port, reload=False)
+    # loop/http stay "auto": uvicorn[standard] installs uvloop and httptools and auto
+    # selects them, falling back to asyncio/h11 where they aren't available
+    uvicorn.run("memo.main:app", host="0.0.0.0", port=settings.port,
+                workers=settings.workers, reload=False)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,114 @@
+"""ASGI middleware that serves JSON responses as MessagePack when the client asks for it."""
+
+import orjson
+import ormsgpack
+
+_MSGPACK_TYPES = (b"application/msgpack", b"application/x-msgpack")
+
+
+def _wants_msgpack(scope: dict) -> bool:
+    """True if Accept rates MessagePack above zero and at least as high as JSON. JSON's
+    rating comes from its most specific match (``application/json``, then
+    ``application/*``, then ``*/*``); wildcards never select MessagePack."""
+    accept = b",".join(value for name, value in scope["headers"] if name == b"accept")
+    msgpack_q = 0.0
+    json_q: dict[bytes, float] = {}
+    for item in accept.split(b","):
+        media_type, *params = item.split(b";")
+        media_type = media_type.strip().lower()
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition(b"=")
+            if key.strip().lower() == b"q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if media_type in _MSGPACK_TYPES:
+            msgpack_q = max(msgpack_q, q)
+        elif media_type in (b"application/json", b"application/*", b"*/*"):
+            json_q[media_type] = max(json_q.get(media_type, 0.0), q)
+    for media_type in (b"application/json", b"application/*", b"*/*"):
+        if media_type in json_q:
+            return msgpack_q > 0 and msgpack_q >= json_q[media_type]
+    return msgpack_q > 0
+
+
+def _vary_accept(headers: list[tuple[bytes, bytes]]) -> list[tuple[bytes, bytes]]:
+    """Headers with Accept folded into a single Vary (e.g. alongside CORS's Origin)."""
+    values: list[bytes] = []
+    rest = []
+    for name, value in headers:
+        if name.lower() == b"vary":
+            values += [v.strip() for v in value.split(b",") if v.strip()]
+        else:
+            rest.append((name, value))
+    if b"accept" not in (v.lower() for v in values):
+        values.append(b"Accept")
+    return rest + [(b"vary", b", ".join(values))]
+
+
+class MsgpackMiddleware:
+    """Re-encode ``application/json`` response bodies with ormsgpack when the request's
+    Accept prefers ``application/msgpack``. JSON responses carry ``Vary: Accept`` either
+    way so shared caches keep the encodings apart. Other responses (NDJSON streams, static
+    files, MCP's event streams) pass through untouched."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if not _wants_msgpack(scope):
+            async def send_json(message: dict) -> None:
+                if message["type"] == "http.response.start":
+                    headers = message.get("headers", [])
+                    if dict(headers).get(b"content-type", b"").startswith(b"application/json"):
+                        message = {**message, "headers": _vary_accept(headers)}
+                await send(message)
+
+            await self.app(scope, receive, send_json)
+            return
+
+        start: dict | None = None
+        passthrough = False
+        chunks: list[bytes] = []
+
+        async def send_wrapper(message: dict) -> None:
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                content_type = dict(message.get("headers", [])).get(b"content-type", b"")
+                if not content_type.startswith(b"application/json"):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start = message
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            chunks.append(message.get("body", b""))
+            if message.get("more_body"):
+                return
+            raw = b"".join(chunks)
+            if not raw:  # e.g. HEAD
+                await send({**start, "headers": _vary_accept(start.get("headers", []))})
+                await send(message)
+                return
+            body = ormsgpack.packb(orjson.loads(raw))
+            headers = [
+                (k, v) for k, v in start.get("headers", [])
+                if k not in (b"content-type", b"content-length")
+            ]
+            headers += [
+                (b"content-type", b"application/msgpack"),
+                (b"content-length", str(len(body)).encode()),
+            ]
+            await send({**start, "headers": _vary_accept(headers)})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
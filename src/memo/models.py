@@ -25,6 +25,15 @@ class StoreResponse(BaseModel):
     id: str
 
 
+class StoreBatchRequest(BaseModel):
+    items: list[StoreRequest]
+
+
+class StoreBatchResponse(BaseModel):
+    ids: list[str | None]            # same order as items; null where the item failed
+    errors: list[str | None]         # same order as items; set where the item failed
+
+
 class Filters(BaseModel):
     tags: list[str] = []
     after: float | None = None       # created_at >= after (Unix timestamp)